@@ -1,7 +1,7 @@
 import os
 from flask import Flask, jsonify
 from .config import get_config
-from .extensions import init_logging, init_cors
+from .extensions import init_logging, init_cors, init_json
 from .api.v1 import bp as api_v1_bp
 
 
@@ -12,6 +12,7 @@ def create_app():
     # Extensions
     init_logging(app)
     init_cors(app)
+    init_json(app)
 
     # Blueprints
     app.register_blueprint(api_v1_bp)
@@ -6,10 +6,16 @@ All three agents run in the same process with different ports.
 """
 from __future__ import annotations
 from uagents import Agent, Context, Model
-from typing import List, Optional, Dict, Any
-import os, base64, aiohttp, re, unicodedata, uuid, threading
-from queue import Queue, Empty
+from typing import List, Optional, Dict, Any, Deque
+import os, sys, base64, aiohttp, re, unicodedata, uuid, threading
+from collections import deque
 from flask import Flask, request, jsonify
+from gevent.pywsgi import WSGIServer
+from cachetools import TTLCache
+
+# The app's JSON provider, imported from app/utils directly (not via the heavy `app` package)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "utils"))
+from serializers import OrjsonProvider  # noqa: E402
 
 # ============================================================================
 # SHARED MODELS
@@ -29,11 +35,13 @@ class GithubPushRequest(Model):
     owner: Optional[str] = None
     token: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
+    request_id: str = ""
 
 class GithubPushResult(Model):
     success: bool
     repo_url: Optional[str] = None
     error: Optional[str] = None
+    request_id: str = ""
 
 class PushDoc(Model):
     payload: Dict[str, Any]
@@ -55,6 +63,8 @@ class PublishOutcome(Model):
 
 ENV_GITHUB_TOKEN = os.getenv("GITHUB_TOKEN", "").strip()
 ENV_GITHUB_USERNAME = os.getenv("GITHUB_USERNAME", "").strip()
+# Echo push outcomes to stdout (blocking writes from the event loop) only when debugging.
+PUBLISHER_DEBUG = os.getenv("PUBLISHER_DEBUG", "0") == "1"
 
 if not ENV_GITHUB_USERNAME:
     print("WARNING: GITHUB_USERNAME is not set; will require 'owner' in request if not provided.")
@@ -135,7 +145,9 @@ async def on_push(ctx: Context, sender: str, req: GithubPushRequest):
     owner = (req.owner or ENV_GITHUB_USERNAME).strip()
     token = (req.token or ENV_GITHUB_TOKEN).strip()
     if not owner or not token:
-        await ctx.send(sender, GithubPushResult(success=False, error="Missing GitHub owner or token"))
+        await ctx.send(sender, GithubPushResult(
+            success=False, error="Missing GitHub owner or token", request_id=req.request_id
+        ))
         return
 
     private = req.visibility != "public"
@@ -153,12 +165,12 @@ async def on_push(ctx: Context, sender: str, req: GithubPushRequest):
                 await gh_put_file(session, owner, repo, f.path, f.content, req.commit_message, branch)
 
         repo_url = f"https://github.com/{owner}/{repo}"
-        await ctx.send(sender, GithubPushResult(success=True, repo_url=repo_url))
+        await ctx.send(sender, GithubPushResult(success=True, repo_url=repo_url, request_id=req.request_id))
         ctx.logger.info(f"[github-agent] ✅ Pushed → {repo_url}")
 
     except Exception as e:
         msg = str(e)
-        await ctx.send(sender, GithubPushResult(success=False, error=msg))
+        await ctx.send(sender, GithubPushResult(success=False, error=msg, request_id=req.request_id))
         ctx.logger.error(f"[github-agent] ❌ Push failed: {msg}")
 
 @github_agent.on_event("startup")
@@ -176,7 +188,8 @@ publisher_client = Agent(
     endpoint=["http://127.0.0.1:8008/submit"],
 )
 
-PENDING: Dict[str, Dict[str, Any]] = {}
+# Bounded so requests whose result never arrives don't accumulate forever.
+PENDING: "TTLCache[str, Dict[str, Any]]" = TTLCache(maxsize=10_000, ttl=3600)
 
 def _slugify(title: str) -> str:
     s = re.sub(r"[^a-zA-Z0-9-_]+", "-", (title or "project").strip()).strip("-")
@@ -189,13 +202,16 @@ def build_push_request_from_doc(doc: Dict[str, Any], *, visibility: str = "priva
     readme_md = idea.get("documentation") or f"# {title}\n\n(Generated README)\n"
 
     files: List[GithubFile] = []
+    has_gitignore = has_license = False
     for cs in (idea.get("code_samples") or []):
         fn = cs.get("filename") or "main.py"
         files.append(GithubFile(path=fn, content=cs.get("content") or ""))
+        has_gitignore = has_gitignore or fn == ".gitignore"
+        has_license = has_license or fn.lower().startswith("license")
 
-    if not any(f.path == ".gitignore" for f in files):
+    if not has_gitignore:
         files.append(GithubFile(path=".gitignore", content="__pycache__/\n.env\n.venv/\n*.pyc\n"))
-    if not any(f.path.lower().startswith("license") for f in files):
+    if not has_license:
         files.append(GithubFile(path="LICENSE", content="MIT License\n\n<add your name/year>"))
 
     return GithubPushRequest(
@@ -216,42 +232,56 @@ def build_push_request_from_doc(doc: Dict[str, Any], *, visibility: str = "priva
 async def publisher_startup(ctx: Context):
     ctx.logger.info(f"[publisher-client] Address: {publisher_client.address}")
 
-@publisher_client.on_message(PushDoc)
-async def on_pushdoc(ctx: Context, sender: str, msg: PushDoc):
-    req = build_push_request_from_doc(msg.payload, visibility=msg.visibility)
-
-    if msg.gh_owner:
-        req.owner = msg.gh_owner.strip()
-    if msg.gh_token:
-        req.token = msg.gh_token.strip()
-
-    rid = msg.request_id or str(uuid.uuid4())
-    PENDING[req.repo_name] = {"cb": msg.callback_address, "rid": rid}
+async def handle_push_doc(
+    ctx: Context,
+    payload: Dict[str, Any],
+    visibility: str,
+    gh_owner: Optional[str],
+    gh_token: Optional[str],
+    rid: str,
+    callback_address: Optional[str],
+):
+    """Build a GithubPushRequest from a PushDoc payload and send it to the github-agent.
+
+    The github-agent replies to whichever agent owns ``ctx``, so that agent must handle
+    GithubPushResult.
+    """
+    req = build_push_request_from_doc(payload, visibility=visibility)
+
+    if gh_owner:
+        req.owner = gh_owner.strip()
+    if gh_token:
+        req.token = gh_token.strip()
+
+    req.request_id = rid
+    PENDING[rid] = {"cb": callback_address}
 
     await ctx.send(github_agent.address, req)
-    ctx.logger.info(f"[publisher-client] Sent GithubPushRequest to github-agent for {req.repo_name}")
+    ctx.logger.info("[publisher-client] Sent GithubPushRequest to github-agent for %s", req.repo_name)
+
+@publisher_client.on_message(PushDoc)
+async def on_pushdoc(ctx: Context, sender: str, msg: PushDoc):
+    await handle_push_doc(
+        ctx, msg.payload, msg.visibility, msg.gh_owner, msg.gh_token,
+        msg.request_id or str(uuid.uuid4()), msg.callback_address,
+    )
 
 @publisher_client.on_message(GithubPushResult)
 async def on_github_result(ctx: Context, sender: str, res: GithubPushResult):
-    repo_name = None
-    if res.repo_url:
-        repo_name = res.repo_url.rstrip("/").split("/")[-1]
-    key = repo_name if repo_name in PENDING else (next(iter(PENDING)) if PENDING else None)
-
-    if key:
-        meta = PENDING.pop(key)
-        cb, rid = meta["cb"], meta["rid"]
-        if cb:
-            await ctx.send(cb, PublishOutcome(
-                request_id=rid, success=res.success, repo_url=res.repo_url, error=res.error
-            ))
+    meta = PENDING.pop(res.request_id, None)
+    if meta and meta["cb"]:
+        await ctx.send(meta["cb"], PublishOutcome(
+            request_id=res.request_id, success=res.success, repo_url=res.repo_url, error=res.error
+        ))
 
     if res.success:
-        ctx.logger.info(f"[publisher-client] ✅ GitHub pushed: {res.repo_url}")
-        print({"pushed": True, "repo_url": res.repo_url})
+        ctx.logger.info("[publisher-client] ✅ GitHub pushed: %s", res.repo_url)
+        if PUBLISHER_DEBUG:
+            print({"pushed": True, "repo_url": res.repo_url})
     else:
-        ctx.logger.error(f"[publisher-client] ❌ GitHub push failed: {res.error}")
-        print({"pushed": False, "error": res.error})
+        ctx.logger.error("[publisher-client] ❌ GitHub push failed: %s", res.error)
+        if PUBLISHER_DEBUG:
+            print({"pushed": False, "error": res.error})
 
 # ============================================================================
 # UI GATEWAY (Flask on port 8090, Agent on port 8091)
@@ -264,10 +294,15 @@ bridge = Agent(
     endpoint=["http://127.0.0.1:8091/submit"],
 )
 
-SEND_QUEUE: "Queue[Dict[str, Any]]" = Queue()
-RESULTS: Dict[str, Dict[str, Any]] = {}
+# deque append/popleft are thread-safe, so the Flask thread and pump need no lock.
+SEND_QUEUE: Deque[Dict[str, Any]] = deque()
+# Finished results expire after an hour; the lock guards access from the Flask thread
+# and the Bureau's event loop thread.
+RESULTS: "TTLCache[str, Dict[str, Any]]" = TTLCache(maxsize=10_000, ttl=3600)
+RESULTS_LOCK = threading.Lock()
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 @app.post("/push")
 def push_handler():
@@ -283,9 +318,10 @@ def push_handler():
         return jsonify({"error": "payload must be a JSON object"}), 400
 
     rid = str(uuid.uuid4())
-    RESULTS[rid] = {"status": "pending"}
+    with RESULTS_LOCK:
+        RESULTS[rid] = {"status": "pending"}
 
-    SEND_QUEUE.put({
+    SEND_QUEUE.append({
         "request_id": rid,
         "visibility": visibility,
         "payload": payload,
@@ -296,7 +332,8 @@ def push_handler():
 
 @app.get("/result/<rid>")
 def result_handler(rid: str):
-    data = RESULTS.get(rid)
+    with RESULTS_LOCK:
+        data = RESULTS.get(rid)
     if not data:
         return jsonify({"error": "unknown request_id"}), 404
     return jsonify(data)
@@ -307,35 +344,39 @@ async def bridge_startup(ctx: Context):
 
 @bridge.on_interval(period=0.1)
 async def pump(ctx: Context):
-    try:
-        while True:
-            item = SEND_QUEUE.get_nowait()
-            rid = item["request_id"]
-            msg = PushDoc(
-                payload=item["payload"],
-                visibility=item["visibility"],
-                request_id=rid,
-                callback_address=bridge.address,
-                gh_owner=item.get("gh_owner"),
-                gh_token=item.get("gh_token"),
-            )
-            await ctx.send(publisher_client.address, msg)
-            ctx.logger.info(f"[ui-gateway] → Forwarded PushDoc ({rid}) to publisher-client")
-    except Empty:
-        pass
+    # Plain poll: an empty deque is a cheap truthiness check per tick.
+    while SEND_QUEUE:
+        item = SEND_QUEUE.popleft()  # only pump pops, so this can't race to empty
+        # Same process as the publisher-client, so skip the PushDoc hop and push directly;
+        # the github-agent's result comes straight back to this agent.
+        await handle_push_doc(
+            ctx, item["payload"], item["visibility"], item.get("gh_owner"), item.get("gh_token"),
+            item["request_id"], None,
+        )
+
+def _record_outcome(ctx: Context, rid: str, success: bool, repo_url: Optional[str], error: Optional[str]):
+    with RESULTS_LOCK:
+        RESULTS[rid] = {
+            "status": "done",
+            "success": success,
+            "repo_url": repo_url,
+            "error": error,
+        }
+    ctx.logger.info("[ui-gateway] ← Outcome for %s: success=%s", rid, success)
+
+@bridge.on_message(GithubPushResult)
+async def on_direct_result(ctx: Context, sender: str, res: GithubPushResult):
+    PENDING.pop(res.request_id, None)
+    _record_outcome(ctx, res.request_id, res.success, res.repo_url, res.error)
 
 @bridge.on_message(PublishOutcome)
 async def on_outcome(ctx: Context, sender: str, msg: PublishOutcome):
-    RESULTS[msg.request_id] = {
-        "status": "done",
-        "success": msg.success,
-        "repo_url": msg.repo_url,
-        "error": msg.error,
-    }
-    ctx.logger.info(f"[ui-gateway] ← Outcome for {msg.request_id}: success={msg.success}")
+    _record_outcome(ctx, msg.request_id, msg.success, msg.repo_url, msg.error)
 
 def run_flask():
-    app.run(host="0.0.0.0", port=8090, debug=False, use_reloader=False, threaded=True)
+    # gevent's WSGI server instead of the Werkzeug dev server. No monkey-patching:
+    # the Bureau's asyncio loop shares this process and the handlers never block.
+    WSGIServer(("0.0.0.0", 8090), app, log=None).serve_forever()
 
 # ============================================================================
 # MAIN - Run all three agents in the same process
@@ -6,7 +6,11 @@ This agent generates research proposals with references given a topic summary
 from uagents import Agent, Context, Model
 from typing import List, Dict
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import re
+import string
 from datetime import datetime
 
 # Define message models
@@ -26,6 +30,18 @@ class ResearchProposal(Model):
     references: List[Dict[str, str]]
     generated_at: str
 
+# Topics are user input; anything outside this set is replaced before it reaches a filename
+_SAFE_FILENAME_RE = re.compile(r"[^A-Za-z0-9_-]+")
+
+# Reuse connections (Keep-Alive)
+SESSION = requests.Session()
+SESSION.headers.update({"User-Agent": "curiosityAI/1.0"})
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3),
+))
+
 # Initialize the agent
 research_agent = Agent(
     name="research_proposal_agent",
@@ -34,6 +50,22 @@ research_agent = Agent(
     endpoint=["http://localhost:8001/submit"]
 )
 
+S2_API = "https://api.semanticscholar.org/graph/v1"
+
+def _fetch_abstracts(paper_ids: List[str]) -> Dict[str, str]:
+    """Abstracts for the given Semantic Scholar paper ids, in one batch request."""
+    if not paper_ids:
+        return {}
+    try:
+        response = SESSION.post(f"{S2_API}/paper/batch", params={"fields": "abstract"},
+                                json={"ids": paper_ids}, timeout=10)
+        response.raise_for_status()
+        # One entry per requested id, in order; null for ids it doesn't know
+        return {pid: (paper or {}).get("abstract") or "" for pid, paper in zip(paper_ids, response.json())}
+    except Exception as e:
+        print(f"Error fetching abstracts: {e}")
+        return {}
+
 # Helper function to search for academic references
 async def search_references(topic: str, num_refs: int = 10) -> List[Dict[str, str]]:
     """
@@ -48,27 +80,34 @@ async def search_references(topic: str, num_refs: int = 10) -> List[Dict[str, st
     
     # Example using Semantic Scholar API (free, no key required)
     try:
-        url = f"https://api.semanticscholar.org/graph/v1/paper/search"
+        url = f"{S2_API}/paper/search"
         params = {
             "query": topic,
             "limit": num_refs,
-            "fields": "title,authors,year,abstract,url,citationCount"
+            # tldr is a one-sentence summary; full abstracts are only fetched (below) for
+            # the papers that have none, instead of for every result
+            "fields": "title,authors,year,tldr,url,citationCount"
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = SESSION.get(url, params=params, timeout=10)
         
         if response.status_code == 200:
-            data = response.json()
+            papers = response.json().get("data", [])[:num_refs]
+            abstracts = _fetch_abstracts([
+                p["paperId"] for p in papers
+                if not (p.get("tldr") or {}).get("text") and p.get("paperId")
+            ])
             
-            for paper in data.get("data", [])[:num_refs]:
-                authors = ", ".join([a.get("name", "") for a in paper.get("authors", [])])
+            for paper in papers:
+                authors = ", ".join([a.get("name", "") for a in (paper.get("authors") or [])[:3]])
+                summary = (paper.get("tldr") or {}).get("text") or abstracts.get(paper.get("paperId"), "")[:200]
                 references.append({
                     "title": paper.get("title", ""),
                     "authors": authors,
                     "year": str(paper.get("year", "")),
                     "url": paper.get("url", ""),
                     "citation_count": str(paper.get("citationCount", 0)),
-                    "abstract": paper.get("abstract", "")[:200] + "..."
+                    "abstract": summary + "..."
                 })
     except Exception as e:
         print(f"Error fetching references: {e}")
@@ -91,33 +130,27 @@ def generate_mock_references(topic: str, num_refs: int) -> List[Dict[str, str]]:
         for i in range(num_refs)
     ]
 
-def generate_proposal_content(topic: str, summary: str, references: List[Dict]) -> Dict[str, str]:
-    """Generate the research proposal sections"""
-    
-    # Generate title
-    title = f"Research Proposal: {topic}"
-    
-    # Generate abstract
-    abstract = f"""
-This research proposal presents a comprehensive study on {topic}. {summary}
+# Proposal boilerplate is fixed; only the topic/summary/reference fields vary per request,
+# so the templates are compiled once at import time.
+_ABSTRACT_TMPL = string.Template("""
+This research proposal presents a comprehensive study on $topic. $summary
 The proposed research aims to investigate key aspects, challenges, and potential
 solutions in this domain. Through a systematic approach combining theoretical
 analysis and practical implementation, this study seeks to contribute valuable
 insights to the field. The expected outcomes include novel methodologies,
 empirical findings, and recommendations for future research directions.
-    """.strip()
-    
-    # Generate introduction
-    introduction = f"""
+""".strip())
+
+_INTRO_TMPL = string.Template("""
 ## 1. Introduction
 
 ### 1.1 Background
-{topic} has emerged as a critical area of research in recent years. {summary}
+$topic has emerged as a critical area of research in recent years. $summary
 The growing importance of this field necessitates deeper investigation into
 its fundamental principles, applications, and implications.
 
 ### 1.2 Problem Statement
-Despite significant progress, several key challenges remain unresolved in {topic}.
+Despite significant progress, several key challenges remain unresolved in $topic.
 These include:
 - Limited understanding of core mechanisms
 - Insufficient empirical evidence
@@ -131,42 +164,38 @@ This research aims to:
 3. Design and implement empirical studies
 4. Validate findings through rigorous analysis
 5. Provide actionable recommendations
-    """.strip()
-    
-    # Generate literature review
-    lit_review = f"""
+""".strip())
+
+_LIT_HEAD_TMPL = string.Template("""
 ## 2. Literature Review
 
 ### 2.1 Theoretical Foundations
-The field of {topic} is built upon several foundational theories and concepts.
+The field of $topic is built upon several foundational theories and concepts.
 Previous research has established important groundwork, as evidenced by the
 extensive body of literature reviewed for this proposal.
 
 ### 2.2 Key Studies
 Recent studies have made significant contributions to our understanding:
 
-"""
-    
-    # Add key references to literature review
-    for i, ref in enumerate(references[:5], 1):
-        lit_review += f"""
-**{i}. {ref['title']}** ({ref['year']})
-- Authors: {ref['authors']}
-- Citations: {ref['citation_count']}
-- Key contribution: {ref['abstract']}
-"""
-    
-    lit_review += """
+""")
+
+_LIT_REF_TMPL = string.Template("""
+**$i. $title** ($year)
+- Authors: $authors
+- Citations: $citation_count
+- Key contribution: $abstract
+""")
+
+_LIT_GAPS = """
 ### 2.3 Research Gaps
 While existing research has made valuable contributions, several gaps remain:
 - Limited scope in certain areas
 - Need for updated methodologies
 - Insufficient cross-domain integration
 - Lack of large-scale empirical validation
-    """.strip()
-    
-    # Generate methodology
-    methodology = f"""
+""".strip()
+
+_METHODOLOGY = """
 ## 3. Research Methodology
 
 ### 3.1 Research Design
@@ -196,14 +225,13 @@ The research will adhere to ethical guidelines including:
 - Data privacy and confidentiality
 - Transparent reporting of findings
 - Acknowledgment of limitations
-    """.strip()
-    
-    # Generate expected outcomes
-    outcomes = f"""
+""".strip()
+
+_OUTCOMES_TMPL = string.Template("""
 ## 4. Expected Outcomes
 
 ### 4.1 Theoretical Contributions
-- Novel frameworks for understanding {topic}
+- Novel frameworks for understanding $topic
 - Enhanced theoretical models
 - Integration of cross-disciplinary insights
 
@@ -217,10 +245,9 @@ The research will adhere to ethical guidelines including:
 - Conference presentations (target: 2-3)
 - Open-source tools and datasets
 - Community engagement and workshops
-    """.strip()
-    
-    # Generate timeline
-    timeline = """
+""".strip())
+
+_TIMELINE = """
 ## 5. Research Timeline
 
 **Phase 1: Literature Review (Months 1-3)**
@@ -247,16 +274,32 @@ The research will adhere to ethical guidelines including:
 - Journal submissions
 - Conference presentations
 - Final report and documentation
-    """.strip()
+""".strip()
+
+def generate_proposal_content(topic: str, summary: str, references: List[Dict]) -> Dict[str, str]:
+    """Generate the research proposal sections"""
+    
+    # Add key references to literature review
+    lit_review = "".join([
+        _LIT_HEAD_TMPL.substitute(topic=topic),
+        *(
+            _LIT_REF_TMPL.substitute(
+                i=i, title=ref['title'], year=ref['year'], authors=ref['authors'],
+                citation_count=ref['citation_count'], abstract=ref['abstract'],
+            )
+            for i, ref in enumerate(references[:5], 1)
+        ),
+        _LIT_GAPS,
+    ])
     
     return {
-        "title": title,
-        "abstract": abstract,
-        "introduction": introduction,
+        "title": f"Research Proposal: {topic}",
+        "abstract": _ABSTRACT_TMPL.substitute(topic=topic, summary=summary),
+        "introduction": _INTRO_TMPL.substitute(topic=topic, summary=summary),
         "literature_review": lit_review,
-        "methodology": methodology,
-        "expected_outcomes": outcomes,
-        "timeline": timeline
+        "methodology": _METHODOLOGY,
+        "expected_outcomes": _OUTCOMES_TMPL.substitute(topic=topic),
+        "timeline": _TIMELINE
     }
 
 @research_agent.on_event("startup")
@@ -267,7 +310,8 @@ async def startup(ctx: Context):
 @research_agent.on_message(model=ResearchRequest)
 async def handle_research_request(ctx: Context, sender: str, msg: ResearchRequest):
     """Handle incoming research proposal requests"""
-    ctx.logger.info(f"Received research request for topic: {msg.topic}")
+    safe_topic = _SAFE_FILENAME_RE.sub("_", msg.topic)[:80] or "proposal"
+    ctx.logger.info(f"Received research request for topic: {safe_topic}")
     
     try:
         # Search for references
@@ -296,15 +340,15 @@ async def handle_research_request(ctx: Context, sender: str, msg: ResearchReques
         ctx.logger.info("Research proposal sent successfully!")
         
         # Save to file
-        filename = f"research_proposal_{msg.topic.replace(' ', '_')}.md"
-        save_proposal_to_file(proposal, filename)
+        filename = save_proposal_to_file(proposal, safe_topic)
         ctx.logger.info(f"Proposal saved to {filename}")
         
     except Exception as e:
         ctx.logger.error(f"Error generating proposal: {e}")
 
-def save_proposal_to_file(proposal: ResearchProposal, filename: str):
-    """Save the research proposal to a markdown file"""
+def save_proposal_to_file(proposal: ResearchProposal, safe_topic: str) -> str:
+    """Save the research proposal to a markdown file and return its name"""
+    filename = f"research_proposal_{safe_topic}.md"
     with open(filename, 'w', encoding='utf-8') as f:
         f.write(f"# {proposal.title}\n\n")
         f.write(f"*Generated on: {proposal.generated_at}*\n\n")
@@ -325,6 +369,7 @@ def save_proposal_to_file(proposal: ResearchProposal, filename: str):
             f.write(f"   - Citations: {ref['citation_count']}\n")
             f.write(f"   - URL: {ref['url']}\n")
             f.write(f"   - Abstract: {ref['abstract']}\n\n")
+    return filename
 
 # Example usage function
 def create_sample_request():
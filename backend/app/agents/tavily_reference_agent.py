@@ -1,30 +1,50 @@
 import os
-import json
+import sys
 import re
 import time
+import functools
+import hashlib
+import threading
+import heapq
 import requests
+from requests.adapters import HTTPAdapter
 from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
 from typing import List, Dict, Any, Tuple, Optional
 from datetime import datetime, timezone
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed, TimeoutError as FuturesTimeout
 from flask import Flask, request, jsonify
 from dotenv import load_dotenv
-
-# pip install tavily-python
-from tavily import TavilyClient
+import ahocorasick  # pip install pyahocorasick
+import ciso8601
+import tldextract
+import orjson
+from cachetools import TTLCache
 
 load_dotenv()
+
+# Shared with the main app. Only app/utils is put on the path (appended, so nothing here is
+# shadowed): importing the `app` package would load the whole API and its models.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "utils"))
+from serializers import OrjsonProvider  # noqa: E402
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 ASI_KEY = os.getenv("ASI_LLM_KEY")
 ASI_URL = os.getenv("ASI_LLM_API_URL", "https://api.asi1.ai/v1/chat/completions")
 TAVILY_KEY = os.getenv("TAVILY_API_KEY")
+TAVILY_URL = os.getenv("TAVILY_API_URL", "https://api.tavily.com/search")
 TAVILY_TIMEOUT = float(os.getenv("TAVILY_TIMEOUT", "20"))  # seconds/network call
 ASI_TIMEOUT = float(os.getenv("ASI_TIMEOUT", "60"))        # seconds total for ASI call
 
-# Reuse connections (Keep-Alive)
+# Reuse connections (Keep-Alive). Tavily is called through this session too: TavilyClient
+# opens a fresh connection (TCP + TLS handshake) for every search.
 SESSION = requests.Session()
-TV: Optional[TavilyClient] = TavilyClient(api_key=TAVILY_KEY) if TAVILY_KEY else None
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
+# Shared by every request for planner/Tavily fan-out, instead of fresh executors per pass
+_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("TV_POOL", "16")), thread_name_prefix="tv")
 
 # ---------------------------
 # Generic relevance heuristics
@@ -44,21 +64,71 @@ TOP_TIER_MEDIA = {
     "techcrunch.com", "theverge.com", "wired.com"
 }
 
+# URL hint categories, as bits so one automaton pass classifies a URL into all of them
+HINT_PRESS, HINT_DOC, HINT_ACADEMIC = 1, 2, 4
+
+def _build_hint_automaton() -> "ahocorasick.Automaton":
+    ac = ahocorasick.Automaton()
+    for bit, hints in ((HINT_PRESS, PRESS_HINTS), (HINT_DOC, DOC_HINTS), (HINT_ACADEMIC, ACADEMIC_HINTS)):
+        for h in hints:
+            ac.add_word(h, ac.get(h, 0) | bit)
+    ac.make_automaton()
+    return ac
+
+_DOMAIN_END = object()
+
+def _build_domain_trie(domains) -> Dict[str, Any]:
+    """Reversed-label trie: 'reddit.com' is stored as com -> reddit, so it also covers subdomains."""
+    trie: Dict[Any, Any] = {}
+    for d in domains:
+        node = trie
+        for label in reversed(d.split(".")):
+            node = node.setdefault(label, {})
+        node[_DOMAIN_END] = True
+    return trie
+
+_TOKEN_RE = re.compile(r"[^a-z0-9]+")
+# Whole path segments that are UUIDs or long numeric IDs (article/page ids)
+_FP_RE = re.compile(r"/(?:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|\d{4,})(?=/|$)", re.I)
+HINT_AC = _build_hint_automaton()
+BLOCK_TRIE = _build_domain_trie(BLOCKLIST_BASE)
+SOFT_BLOCK_TRIE = _build_domain_trie(SOFT_BLOCK)
+TOP_TIER_TRIE = _build_domain_trie(TOP_TIER_MEDIA)
+
 # ---------------------------
 # Small utils
 # ---------------------------
 def _dedupe_preserve(seq: List[str]) -> List[str]:
-    seen = set(); out = []
-    for x in seq:
-        if x not in seen:
-            seen.add(x); out.append(x)
-    return out
-
-def _domain(url: str) -> str:
+    return list(dict.fromkeys(seq))  # dicts keep insertion order
+
+# Bundled public-suffix snapshot, in memory only (no suffix-list download, no disk cache)
+_TLD = tldextract.TLDExtract(cache_dir=None, suffix_list_urls=())
+
+@functools.lru_cache(maxsize=4096)
+def _registrable(host: str) -> str:
+    """Registrable domain of a host (www.bbc.co.uk -> bbc.co.uk); the host itself for IPs/localhost."""
+    return _TLD(host).registered_domain or host
+
+# URLs repeat across queries and passes (and across requests), so parses are memoized.
+@functools.lru_cache(maxsize=4096)
+def _host(url: str) -> str:
+    """Full lowercased host; block/soft-block checks use this so subdomain entries match."""
+    # Fast path for the common absolute http(s) URL; same host as urlparse().netloc
+    if url.startswith(("https://", "http://")):
+        return url.split("/", 3)[2].split("?", 1)[0].split("#", 1)[0].lower()
     try: return urlparse(url).netloc.lower()
     except Exception: return ""
 
+def _domain(url: str) -> str:
+    """Registrable domain, for diversity counting and preferred-domain matching."""
+    host = _host(url)
+    return _registrable(host) if host else ""
+
+@functools.lru_cache(maxsize=4096)
 def _normalize_url(url: str) -> str:
+    # Nothing to strip: no query, fragment, params or trailing slash
+    if url.startswith(("https://", "http://")) and not url.endswith("/") and not any(c in url for c in "?#;"):
+        return url
     try:
         u = urlparse(url)
         if not u.scheme.startswith("http"): return url
@@ -70,40 +140,84 @@ def _normalize_url(url: str) -> str:
     except Exception:
         return url
 
+def _fingerprint(norm_url: str) -> str:
+    """Host + path of a normalized URL with ID path segments templated, plus its sorted query,
+    so /a/1234 and /a/5678 collide but watch?v=abc and watch?v=def stay distinct."""
+    base, _, query = norm_url.split("#", 1)[0].partition("?")
+    fp = _FP_RE.sub("/{id}", base.split("://", 1)[-1])
+    if query:
+        fp += "?" + urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+    return fp
+
 def _now_utc() -> datetime:
     return datetime.now(timezone.utc)
 
+# Results in a batch often share publication dates
+@functools.lru_cache(maxsize=2048)
 def _parse_date(val: Optional[str]) -> Optional[datetime]:
     if not val: return None
-    for fmt in ("%Y-%m-%d", "%Y-%m-%dT%H:%M:%SZ", "%a, %d %b %Y %H:%M:%S %Z"):
-        try:
-            dt = datetime.strptime(val, fmt)
-            if not dt.tzinfo: dt = dt.replace(tzinfo=timezone.utc)
-            return dt
-        except Exception: continue
-    try: return datetime.fromisoformat(val.replace("Z", "+00:00"))
-    except Exception: return None
+    try: dt = ciso8601.parse_datetime(val)  # ISO 8601 / RFC 3339
+    except Exception:
+        try: dt = parsedate_to_datetime(val)  # RFC 2822, e.g. "Tue, 01 Oct 2024 10:00:00 GMT"
+        except Exception: return None
+    if not dt.tzinfo: dt = dt.replace(tzinfo=timezone.utc)
+    return dt
 
 def _extract_json(text: str) -> Any:
-    try: return json.loads(text)
+    try: return orjson.loads(text)
     except Exception: pass
     s = text.find("{"); e = text.rfind("}")
     if s != -1 and e != -1 and e > s:
-        try: return json.loads(text[s:e+1])
+        try: return orjson.loads(text[s:e+1])
         except Exception: pass
     return None
 
-def _has_any(url: str, needles: set[str]) -> bool:
-    u = url.lower()
-    return any(n in u for n in needles)
+def _hint_flags(url_lower: str) -> int:
+    """Bitmask of HINT_* categories whose tokens occur in the (lowercased) URL."""
+    flags = 0
+    for _, bit in HINT_AC.iter(url_lower):
+        flags |= bit
+    return flags
+
+def _in_domain_trie(trie: Dict[Any, Any], domain: str) -> bool:
+    node = trie
+    for label in reversed(domain.split(".")):
+        node = node.get(label)
+        if node is None: return False
+        if _DOMAIN_END in node: return True
+    return False
+
+def _is_blocked(domain: str, trie: Dict[Any, Any] = BLOCK_TRIE) -> bool:
+    """True if `domain` or any parent domain is in the block trie (old.reddit.com -> reddit.com)."""
+    return _in_domain_trie(trie, domain)
 
 # ---------------------------
 # ASI1-mini planner (generic)
 # ---------------------------
-def plan_from_asi(text: str, max_queries: int = 6, max_domains: int = 8) -> Tuple[List[str], List[str], bool]:
-    """Return (queries, preferred_domains, time_sensitive)."""
+# Repeat fact-checks send the same text; plans are cached by a hash of its first 2 KB.
+_PLAN_CACHE: "TTLCache[Tuple[bytes, int, int], Tuple[List[str], List[str], bool]]" = TTLCache(maxsize=1024, ttl=3600)
+_PLAN_CACHE_LOCK = threading.Lock()
+
+def _plan_key(text: str, max_queries: int, max_domains: int) -> Tuple[bytes, int, int]:
+    digest = hashlib.blake2b(text[:2048].encode("utf-8"), digest_size=16).digest()
+    return digest, max_queries, max_domains
+
+def plan_from_asi(text: str, max_queries: int = 6, max_domains: int = 8, fast: bool = False) -> Tuple[List[str], List[str], bool]:
+    """Return (queries, preferred_domains, time_sensitive).
+
+    With fast=True, short inputs (a name, a one-line claim) skip the planner and are searched as-is.
+    """
     if not ASI_KEY:
         return [text[:300]], [], True
+    if fast and (len(text) < 80 or text.count(" ") < 6):
+        return [text[:300]], [], True
+
+    key = _plan_key(text, max_queries, max_domains)
+    with _PLAN_CACHE_LOCK:
+        cached = _PLAN_CACHE.get(key)
+    if cached:
+        q, d, time_sensitive = cached
+        return list(q), list(d), time_sensitive
 
     sys_prompt = f"""
 You craft generic search plans for fact-checking across any topic.
@@ -139,7 +253,7 @@ Rules:
             timeout=(10, ASI_TIMEOUT),
         )
         resp.raise_for_status()
-        msg = resp.json().get("choices", [{}])[0].get("message", {}).get("content", "")
+        msg = orjson.loads(resp.content).get("choices", [{}])[0].get("message", {}).get("content", "")
         parsed = _extract_json(msg) or {}
         queries = parsed.get("queries") if isinstance(parsed, dict) else None
         domains = parsed.get("preferred_domains") if isinstance(parsed, dict) else None
@@ -150,6 +264,8 @@ Rules:
 
         q = q[:max_queries] or [text[:300]]
         d = [x for x in d if x][:max_domains]
+        with _PLAN_CACHE_LOCK:
+            _PLAN_CACHE[key] = (list(q), list(d), time_sensitive)
         return q, d, time_sensitive
     except Exception:
         return [text[:300]], [], True
@@ -157,90 +273,110 @@ Rules:
 # ---------------------------
 # Scoring (generic)
 # ---------------------------
-def _authority_score(domain: str, url: str, preferred_domains: List[str], mode: str) -> float:
-    score = 0.0; u = url.lower()
-    if domain in preferred_domains: score += 3.0
-    if domain.endswith(".gov"): score += 2.6
-    if domain.endswith(".edu"): score += 2.3
-    if _has_any(u, PRESS_HINTS): score += 1.5
-    if _has_any(u, DOC_HINTS): score += 1.3
-    if _has_any(u, ACADEMIC_HINTS): score += 1.2
-    if domain in TOP_TIER_MEDIA: score += 1.0
-    if domain in BLOCKLIST_BASE: score -= 4.0
-    if domain in SOFT_BLOCK: score -= 0.6
-    if mode == "official_first" and (domain.endswith((".gov", ".edu")) or _has_any(u, PRESS_HINTS) or _has_any(u, DOC_HINTS)):
+def _authority_score(domain: str, host: str, url_lower: str, pref: frozenset[str], mode: str) -> float:
+    score = 0.0
+    hints = _hint_flags(url_lower)
+    top_tier = _in_domain_trie(TOP_TIER_TRIE, domain)
+    if domain in pref: score += 3.0
+    is_govedu = domain.endswith((".gov", ".edu"))
+    if is_govedu: score += 2.6 if domain.endswith(".gov") else 2.3
+    if hints & HINT_PRESS: score += 1.5
+    if hints & HINT_DOC: score += 1.3
+    if hints & HINT_ACADEMIC: score += 1.2
+    if top_tier: score += 1.0
+    if _is_blocked(host): score -= 4.0
+    if _in_domain_trie(SOFT_BLOCK_TRIE, host): score -= 0.6
+    if mode == "official_first" and (is_govedu or hints & (HINT_PRESS | HINT_DOC)):
         score += 0.6
-    elif mode == "media_first" and domain in TOP_TIER_MEDIA:
+    elif mode == "media_first" and top_tier:
         score += 0.6
     return score
 
-def _keyword_score(text: str, queries: List[str]) -> float:
+def _query_tokens(queries: List[str]) -> frozenset[str]:
+    """Keyword tokens of the first two queries; computed once per ranking pass."""
     base = " ".join(queries[:2]).lower()
-    tokens = {t for t in re.split(r"[^a-z0-9]+", base) if len(t) > 3}
+    return frozenset(t for t in _TOKEN_RE.split(base) if len(t) > 3)
+
+def _keyword_score_fast(text_lower: str, tokens: frozenset[str]) -> float:
     if not tokens: return 0.0
-    t = text.lower()
-    hits = sum(1 for tok in tokens if tok in t)
-    return min(1.0, hits / (len(tokens) or 1))
+    hits = sum(1 for tok in tokens if tok in text_lower)
+    return min(1.0, hits / len(tokens))
 
-def _recency_score(published: Optional[str]) -> float:
+def _recency_score(published: Optional[str], now: datetime) -> float:
     if not published: return 0.3
     dt = _parse_date(published)
     if not dt: return 0.4
-    days = max(0, (_now_utc() - dt).days)
+    days = max(0, (now - dt).days)
     return max(0.0, 1.0 - (days / 365.0))
 
-def rank_results(results: List[Dict[str, Any]], preferred_domains: List[str], queries: List[str], mode: str) -> List[Tuple[float, str, str]]:
-    ranked = []
-    for r in results:
-        url = _normalize_url(str(r.get("url", "")).strip())
-        if not url.startswith("http"): continue
-        domain = _domain(url)
-        title = (r.get("title") or "") + " " + (r.get("content") or r.get("snippet") or "")
-        published = r.get("published_date") or r.get("date")
-        score = (
-            0.55 * _authority_score(domain, url, preferred_domains, mode) +
-            0.25 * _recency_score(published) +
-            0.20 * _keyword_score(title, queries)
-        )
-        # Penalize non-official PDFs (keeps .gov/.edu or preferred domains)
-        if url.lower().endswith(".pdf") and (domain not in preferred_domains) and not (domain.endswith(".gov") or domain.endswith(".edu")):
-            score -= 1.0
-        ranked.append((score, url, domain))
-    ranked.sort(key=lambda x: x[0], reverse=True)
-    return ranked
-
-def _merge_domain_diverse(ranked: List[Tuple[float, str, str]], k: int, block_social: bool) -> List[str]:
-    out: List[str] = []; seen_domains: set[str] = set()
+def _score_result(r: Dict[str, Any], pref: frozenset[str], q_tokens: frozenset[str], mode: str, now: datetime) -> Optional[Tuple[float, str, str]]:
+    url = _normalize_url(str(r.get("url", "")).strip())
+    if not url.startswith("http"): return None
+    host = _host(url); domain = _registrable(host) if host else ""
+    url_lower = url.lower()
+    title = (r.get("title") or "") + " " + (r.get("content") or r.get("snippet") or "")
+    published = r.get("published_date") or r.get("date")
+    score = (
+        0.55 * _authority_score(domain, host, url_lower, pref, mode) +
+        0.25 * _recency_score(published, now) +
+        0.20 * _keyword_score_fast(title.lower(), q_tokens)
+    )
+    # Penalize non-official PDFs (keeps .gov/.edu or preferred domains)
+    if url_lower.endswith(".pdf") and (domain not in pref) and not domain.endswith((".gov", ".edu")):
+        score -= 1.0
+    return score, url, domain
+
+def _merge_domain_diverse(ranked: List[Tuple[float, str, str]], k: int, block_social: bool,
+                          block_trie: Dict[Any, Any] = BLOCK_TRIE) -> List[str]:
+    # Drop blocked hosts once; both passes below share the filtered list
+    if block_social:
+        ranked = [r for r in ranked if not _is_blocked(_host(r[1]), block_trie)]
+    out: List[str] = []; picked: set[str] = set(); seen_domains: set[str] = set()
     for _, url, dom in ranked:
-        if block_social and (dom in BLOCKLIST_BASE): continue
-        if url in out: continue
+        if url in picked: continue
         if dom not in seen_domains:
-            out.append(url); seen_domains.add(dom)
+            out.append(url); picked.add(url); seen_domains.add(dom)
         if len(out) >= k: return out
     for _, url, dom in ranked:
-        if block_social and (dom in BLOCKLIST_BASE): continue
-        if url in out: continue
-        out.append(url)
+        if url in picked: continue
+        out.append(url); picked.add(url)
         if len(out) >= k: break
     return out
 
 # ---------------------------
 # Tavily search (fast + parallel + early stop)
 # ---------------------------
+PASS1_GOOD_SCORE = 1.0  # a preferred-domain hit alone contributes 0.55 * 3.0
 def _tv_search_call(q: str, *, include_domains=None, exclude_domains=None, days=365, search_depth="advanced", stype="general", max_results=8):
-    # Use the global client; Tavily client does per-call timeouts internally via httpx defaults.
-    # We just rely on Tavily's backend; if you want per-call timeouts here, wrap with threads and timeouts.
-    return TV.search(
-        q,
-        max_results=max_results,
-        search_depth=search_depth,
-        include_raw_content=False,     # was True — turning off speeds things up a lot
-        include_answer=False,
-        include_images=False,
-        include_domains=include_domains,
-        exclude_domains=exclude_domains,
-        days=days,
-        search_type=stype,
+    # Same payload TavilyClient.search sends, posted over the pooled keep-alive session.
+    payload = {
+        "query": q,
+        "max_results": max_results,
+        "search_depth": search_depth,
+        "include_raw_content": False,  # was True — turning off speeds things up a lot
+        "include_answer": False,
+        "include_images": False,
+        "include_domains": include_domains,
+        "exclude_domains": exclude_domains,
+        "days": days,
+        "search_type": stype,
+    }
+    resp = SESSION.post(
+        TAVILY_URL,
+        headers={"Authorization": f"Bearer {TAVILY_KEY}", "Content-Type": "application/json"},
+        json={k: v for k, v in payload.items() if v is not None},
+        timeout=(10, TAVILY_TIMEOUT),
+    )
+    resp.raise_for_status()
+    return orjson.loads(resp.content)
+
+def _seed_search(text: str, *, days: int, search_depth: str, fast: bool, exclude_domains: Optional[List[str]] = None):
+    """Broad search on the raw request text, started while the ASI planner is still running."""
+    blocklist = BLOCKLIST_BASE | {d.lower() for d in (exclude_domains or [])}
+    return _tv_search_call(
+        text[:300], include_domains=None, exclude_domains=sorted(blocklist),
+        days=min(days, 120) if fast else days, search_depth="basic" if fast else search_depth,
+        stype="news", max_results=4 if fast else 8,
     )
 
 def tavily_best_links(
@@ -255,13 +391,20 @@ def tavily_best_links(
     time_sensitive: bool = True,
     fast: bool = False,
     budget_ms: Optional[int] = None,
+    seed: Optional[Tuple[str, "Future[Dict[str, Any]]"]] = None,
 ) -> List[str]:
-    if TV is None: return []
+    """`seed` is an in-flight (query, future) from _seed_search; its results join the ranking
+    and that query is not searched broadly again."""
+    if not TAVILY_KEY: return []
     start = time.monotonic()
     def time_left() -> float:
         if budget_ms is None: return 1e9
         return max(0.0, (budget_ms / 1000.0) - (time.monotonic() - start))
 
+    # Canonicalize so case/whitespace variants from the planner don't cost extra searches
+    queries = _dedupe_preserve([" ".join(q.lower().split()) for q in queries if q and q.strip()])
+    if not queries: return []
+
     # Fast mode tweaks
     if fast:
         search_depth = "basic"
@@ -273,74 +416,91 @@ def tavily_best_links(
         per_query = 8
 
     blocklist = set(BLOCKLIST_BASE)
+    block_trie = BLOCK_TRIE
     if exclude_domains:
         blocklist.update([d.lower() for d in exclude_domains])
-
-    raw: List[Dict[str, Any]] = []
+        block_trie = _build_domain_trie(blocklist)
+
+    # Results are scored as they arrive; only the top `keep` survive in a min-heap.
+    best: List[Tuple[float, str, str]] = []
+    keep = max_links * 4
+    pref = frozenset(_registrable(d) for d in (preferred_domains or [])); q_tokens = _query_tokens(queries); now = _now_utc()
+    seen_norm: set[str] = set(); fp_best: Dict[str, Tuple[float, str, str]] = {}
+    good_hits: Dict[str, int] = {}  # per query: Pass-1 results scoring >= PASS1_GOOD_SCORE
     dom_focus = [d for d in (preferred_domains or []) if d] + [d for d in (include_domains or []) if d]
-    dom_focus = [d.lower() for d in dom_focus if d.lower() not in blocklist][:12]
+    dom_focus = [d.lower() for d in dom_focus if not _is_blocked(d.lower(), block_trie)][:12]
     stype = "news" if time_sensitive else "general"
 
-    # Helper to add results & early stop
-    def extend_results(res):
+    # Helper to dedupe, score & keep the best results (also drives early stop)
+    def extend_results(res, q: str):
         items = res.get("results", []) if isinstance(res, dict) else []
         for it in items:
             u = str(it.get("url", "")).strip()
-            if u.startswith("http"):
-                raw.append(it)
-
-    # PASS 1: preferred domains (in parallel)
-    if dom_focus and time_left() > 0.05:
-        with ThreadPoolExecutor(max_workers=min(8, len(queries))) as ex:
-            futs = [
-                ex.submit(_tv_search_call, q,
-                          include_domains=dom_focus, exclude_domains=None,
-                          days=days, search_depth=search_depth, stype=stype, max_results=per_query)
-                for q in queries
-            ]
-            for f in as_completed(futs, timeout=None):
-                if budget_ms is not None and time_left() <= 0.0:
-                    break
+            if not u.startswith("http"): continue
+            norm = _normalize_url(u)
+            if norm in seen_norm: continue
+            seen_norm.add(norm)
+            scored = _score_result(it, pref, q_tokens, mode, now)
+            if not scored: continue
+            # Collapse ID-varied URLs of one endpoint (highest score wins), except where the
+            # exact path matters: preferred and .gov/.edu domains
+            prev = None
+            dom = scored[2]
+            if dom not in pref and not dom.endswith((".gov", ".edu")):
+                fp = _fingerprint(norm)
+                prev = fp_best.get(fp)
+                if prev is not None and prev[0] >= scored[0]: continue
+                fp_best[fp] = scored
+                if prev is not None and prev in best:
+                    best.remove(prev); heapq.heapify(best)  # `best` holds at most `keep` rows
+            if scored[0] >= PASS1_GOOD_SCORE and (prev is None or prev[0] < PASS1_GOOD_SCORE):
+                good_hits[q] = good_hits.get(q, 0) + 1
+            if len(best) < keep:
+                heapq.heappush(best, scored)
+            else:
+                heapq.heappushpop(best, scored)
+
+    # Run one search per query on the shared pool; stop at the budget or once `stop_at` unique
+    # URLs are in, cancelling whatever hasn't started yet
+    def fan_out(qs: List[str], stop_at: int, **kw):
+        futs = {
+            _POOL.submit(_tv_search_call, q, days=days, search_depth=search_depth,
+                         stype=stype, max_results=per_query, **kw): q
+            for q in qs
+        }
+        try:
+            for f in as_completed(futs, timeout=time_left() if budget_ms is not None else None):
                 try:
-                    res = f.result(timeout=TAVILY_TIMEOUT)
-                    extend_results(res)
+                    extend_results(f.result(), futs[f])
                 except Exception:
                     continue
-                # Early stop if we already have enough unique URLs
-                if len({_normalize_url(str(i.get("url",""))) for i in raw}) >= max_links * 2:
+                if len(seen_norm) >= stop_at:
                     break
+        except FuturesTimeout:
+            pass
+        finally:
+            for f in futs: f.cancel()
 
-    # PASS 2: broader (parallel), only if we still need more
-    if time_left() > 0.05 and len(raw) < max_links * 2:
-        with ThreadPoolExecutor(max_workers=min(8, len(queries))) as ex:
-            futs = [
-                ex.submit(_tv_search_call, q,
-                          include_domains=None, exclude_domains=list(blocklist),
-                          days=days, search_depth=search_depth, stype=stype, max_results=per_query)
-                for q in queries
-            ]
-            for f in as_completed(futs, timeout=None):
-                if budget_ms is not None and time_left() <= 0.0:
-                    break
-                try:
-                    res = f.result(timeout=TAVILY_TIMEOUT)
-                    extend_results(res)
-                except Exception:
-                    continue
-                if len({_normalize_url(str(i.get("url",""))) for i in raw}) >= max_links * 3:
-                    break
+    # PASS 1: preferred domains (in parallel)
+    if dom_focus and time_left() > 0.05:
+        fan_out(queries, max_links * 2, include_domains=dom_focus, exclude_domains=None)
 
-    # Dedupe & rank
-    seen = set(); unique: List[Dict[str, Any]] = []
-    for item in raw:
-        u = _normalize_url(str(item.get("url","")).strip())
-        if not u.startswith("http"): continue
-        if u in seen: continue
-        seen.add(u); unique.append(item)
+    # Seed search ran concurrently with planning (and Pass 1); fold it in before deciding on Pass 2
+    seed_q = None
+    if seed is not None:
+        seed_q = " ".join(seed[0].lower().split())
+        try: extend_results(seed[1].result(timeout=min(TAVILY_TIMEOUT, time_left())), seed_q)
+        except Exception: pass
 
-    ranked = rank_results(unique, preferred_domains, queries, mode)
+    # PASS 2: broader (parallel), only if we still need more, and only for queries
+    # that Pass 1 (or the seed search) didn't already answer well
+    broad_queries = [q for q in queries if q != seed_q and good_hits.get(q, 0) < per_query // 2]
+    if broad_queries and time_left() > 0.05 and len(seen_norm) < max_links * 2:
+        fan_out(broad_queries, max_links * 3, include_domains=None, exclude_domains=sorted(blocklist))
+
+    ranked = sorted(best, reverse=True)
     block_social = True
-    out = _merge_domain_diverse(ranked, k=max_links, block_social=block_social)
+    out = _merge_domain_diverse(ranked, k=max_links, block_social=block_social, block_trie=block_trie)
     return out[:max_links]
 
 # ---------------------------
@@ -391,7 +551,12 @@ def references():
 
     # Fewer queries in fast mode
     q_cap = 4 if fast else max_refs if max_refs >= 3 else 3
-    queries, preferred_domains, time_sensitive = plan_from_asi(text.strip(), max_queries=q_cap)
+    # Overlap planning with a broad search on the raw text, hiding the ASI latency
+    seed_text = text.strip()[:300]
+    seed_fut = _POOL.submit(_seed_search, seed_text, days=days, search_depth=search_depth,
+                            fast=fast, exclude_domains=exclude_domains)
+    plan_fut = _POOL.submit(plan_from_asi, text.strip(), max_queries=q_cap, fast=fast)
+    queries, preferred_domains, time_sensitive = plan_fut.result()
 
     links = tavily_best_links(
         queries=queries,
@@ -405,6 +570,7 @@ def references():
         time_sensitive=time_sensitive,
         fast=fast,
         budget_ms=budget_ms,
+        seed=(seed_text, seed_fut),
     )
     return jsonify({"links": links}), 200
 
@@ -415,4 +581,17 @@ def health():
 if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("TAVILY_REFERENCE_AGENT_PORT", os.getenv("PORT", "8007")))
-    app.run(host=host, port=port, debug=os.getenv("FLASK_DEBUG", "0") == "1")
+    if os.getenv("FLASK_DEBUG", "0") == "1":
+        app.run(host=host, port=port, debug=True)
+    else:
+        # Preforked gunicorn workers with a thread pool each: requests spend their time waiting
+        # on ASI/Tavily, so threads give the concurrency and processes isolate slow requests.
+        workers = os.getenv("TV_WORKERS", str(os.cpu_count() or 2))
+        threads = os.getenv("TV_THREADS", "8")
+        # Through this interpreter, so it works without an activated venv putting gunicorn on PATH
+        os.execv(sys.executable, [
+            sys.executable, "-m", "gunicorn", "--chdir", os.path.dirname(os.path.abspath(__file__)),
+            "-k", "gthread", "-w", workers, "--threads", threads,
+            "--timeout", str(int(ASI_TIMEOUT + 2 * TAVILY_TIMEOUT + 30)),
+            "-b", f"{host}:{port}", "tavily_reference_agent:app",
+        ])
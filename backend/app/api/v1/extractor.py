@@ -5,12 +5,33 @@ from app.utils.common import process_keywords
 import anthropic
 import os, numpy as np
 from app.utils.chroma import get_chroma_collection
-import umap, json, uuid
+from app.utils.models_singleton import CORRECTOR
+import umap, json, uuid, hashlib, threading
+from operator import itemgetter
+from collections import OrderedDict
 from hdbscan import HDBSCAN
-import matplotlib.pyplot as plt
 from sklearn.mixture import GaussianMixture  # For GMM
-from scipy.optimize import minimize  # For inverse design optimization
+from sklearn.decomposition import PCA
+from scipy.optimize import minimize, Bounds  # For inverse design optimization
+from scipy.special import logsumexp
+from scipy.stats import qmc
+from concurrent.futures import ThreadPoolExecutor
 import vec2text
+try:
+    from numba import njit
+except ImportError:  # optional: the numpy objective below is used instead
+    njit = None
+
+# Optional GPU path for get3Dpoints (RAPIDS cuML); falls back to umap-learn/hdbscan
+USE_CUML = os.getenv("USE_CUML", "0") == "1"
+if USE_CUML:
+    try:
+        import cupy
+        from cuml import UMAP as cuUMAP
+        from cuml.cluster import HDBSCAN as cuHDBSCAN
+    except ImportError:
+        print("USE_CUML=1 but cuML/CuPy is not installed; using CPU UMAP/HDBSCAN")
+        USE_CUML = False
 
 client = anthropic.Anthropic(
     api_key=os.environ.get("CLAUDE_API_KEY")
@@ -21,16 +42,134 @@ SUMMARIZATION_PROMPT = '''
             Focus on what was studied, how, and the main result. Use active voice where possible, include the primary outcome/conclusion, 
             and avoid jargon unless essential.   
         '''
-umap_3d = umap.UMAP(n_components=3, random_state=42) # for UI
-reducer = umap.UMAP(n_components=10, random_state=42)  # Reduce to 10 dims for efficiency for clustering
-clusterer = HDBSCAN(
+UMAP, Clusterer = (cuUMAP, cuHDBSCAN) if USE_CUML else (umap.UMAP, HDBSCAN)
+reducer = UMAP(n_components=10, random_state=42)  # Reduce to 10 dims for clustering; PCA of it gives the 3D UI view
+clusterer = Clusterer(
     min_cluster_size=15,  # Min points for a cluster; increase for larger clusters
     min_samples=5,        # Controls noise sensitivity; higher = more outliers (gaps)
     metric='euclidean',   # Good for reduced_embeddings; use 'cosine' if normalized
     cluster_selection_method='eom'  # 'eom' for balanced clusters; 'leaf' for finer ones
 )
 
-corrector = vec2text.load_pretrained_corrector('gtr-base')
+corrector = CORRECTOR  # shared with the embedding function's models
+
+CHROMA_PAGE = 1000  # rows per collection.get page
+CHROMA_ADD_BATCH = 64  # rows per collection.add (embed + upload) call
+GAP_SOBOL_STARTS = int(os.getenv("GAP_SOBOL_STARTS", "16"))  # extra L-BFGS-B starts in findIdeas
+
+# findIdeas results per collection snapshot (hash of its ids), most recent last
+IDEA_CACHE_SIZE = 8
+_idea_cache = OrderedDict()
+_idea_cache_lock = threading.Lock()
+
+# get3Dpoints output (3D projection, cluster labels) by hash of the embedding matrix
+PROJECTION_CACHE_SIZE = 4
+_projection_cache = OrderedDict()
+_projection_cache_lock = threading.Lock()
+
+
+def snapshot_key(ids):
+    """Order-independent key for the set of ids currently in the collection."""
+    return hashlib.blake2b("\n".join(sorted(ids)).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def load_embeddings(collection, include=('metadatas', 'documents'), page=CHROMA_PAGE):
+    """
+    Page through the collection, copying embeddings straight into one preallocated
+    float32 matrix instead of materialising the whole list-of-lists first.
+    Returns (ids, embeddings, {field: list} for each extra field in include).
+    """
+    total = collection.count()
+    ids, columns = [], {field: [] for field in include}
+    embeddings = None
+    filled = 0
+    for offset in range(0, total, page):
+        batch = collection.get(include=['embeddings', *include], limit=page, offset=offset)
+        rows = batch['embeddings']
+        if rows is None or len(rows) == 0:
+            break
+        if embeddings is None:
+            embeddings = np.empty((total, len(rows[0])), dtype=np.float32)
+        # Rows added after count() (concurrent /extractor) don't fit; clamp so ids,
+        # columns and the matrix stay aligned to the same `total` rows
+        n = min(len(rows), total - filled)
+        embeddings[filled:filled + n] = np.asarray(rows[:n], dtype=np.float32)
+        filled += n
+        ids.extend(batch['ids'][:n])
+        for field in include:
+            columns[field].extend(batch[field][:n])
+        if filled == total:
+            break
+
+    if embeddings is None:
+        embeddings = np.empty((0, 768), dtype=np.float32)
+    return ids, embeddings[:filled], columns
+
+if njit is not None:
+    @njit(cache=True, fastmath=True, nogil=True)
+    def _diag_gmm_logp_grad(x, means, prec_chol, log_norm):
+        """Compiled version of log_density below: mixture log-density and its gradient."""
+        k_count, dim = means.shape
+        comp = np.empty(k_count)
+        for k in range(k_count):
+            acc = 0.0
+            for j in range(dim):
+                y = (x[j] - means[k, j]) * prec_chol[k, j]
+                acc += y * y
+            comp[k] = log_norm[k] - 0.5 * acc
+        top = comp.max()
+        total = 0.0
+        for k in range(k_count):
+            total += np.exp(comp[k] - top)
+        logp = top + np.log(total)
+        grad = np.zeros(dim)
+        for k in range(k_count):
+            resp = np.exp(comp[k] - logp)
+            for j in range(dim):
+                p = prec_chol[k, j]
+                grad[j] -= resp * (x[j] - means[k, j]) * p * p
+        return logp, grad
+
+    @njit(cache=True, fastmath=True, nogil=True)
+    def _diag_gmm_logp_grad_batch(xs, means, prec_chol, log_norm):
+        logp = np.empty(xs.shape[0])
+        grad = np.empty(xs.shape)
+        for i in range(xs.shape[0]):
+            logp[i], grad[i] = _diag_gmm_logp_grad(xs[i], means, prec_chol, log_norm)
+        return logp, grad
+
+
+def gmm_log_density(gmm):
+    """
+    Closed-form log-density of a fitted diagonal-covariance GMM and its gradient, for
+    use as an L-BFGS-B objective. Per-component constants are computed once here
+    rather than on every score_samples call. The returned function takes a batch of
+    points (M, D) and gives log-densities (M,) and gradients (M, D).
+    """
+    means = gmm.means_                      # (K, D)
+    prec_chol = gmm.precisions_cholesky_    # (K, D): 1/σ per dimension
+    d = means.shape[1]
+    # log w_k - D/2 log(2π) + Σ log(1/σ_k)
+    log_norm = (np.log(gmm.weights_) - 0.5 * d * np.log(2 * np.pi)
+                + np.log(prec_chol).sum(axis=1))
+
+    if njit is not None:
+        means = np.ascontiguousarray(means, dtype=np.float64)
+        prec_chol = np.ascontiguousarray(prec_chol, dtype=np.float64)
+        log_norm = np.ascontiguousarray(log_norm, dtype=np.float64)
+        return lambda xs: _diag_gmm_logp_grad_batch(np.asarray(xs, dtype=np.float64), means, prec_chol, log_norm)
+
+    def log_density(xs):
+        y = (xs[:, None, :] - means) * prec_chol            # (x-μ_k)/σ_k, (M, K, D)
+        comp = log_norm - 0.5 * (y * y).sum(axis=2)         # (M, K)
+        logp = logsumexp(comp, axis=1)
+        resp = np.exp(comp - logp[:, None])                 # responsibilities
+        # ∇ log N_k = -(x-μ_k)/σ_k²
+        grad = -(resp[:, :, None] * y * prec_chol).sum(axis=1)
+        return logp, grad
+
+    return log_density
+
 
 @bp.post("/extractor")
 def extractor():
@@ -47,13 +186,21 @@ def extractor():
 
     records = process_keywords(keywords, max_results=max_results)
     l = len(records)
-    
-    #store in the chroma DB
-    collection.add(
-        ids = [uuid.uuid4().hex for _ in range(l)],
-        documents= [ item['summary'] for item in records],
-        metadatas= [ {'link':item['link'], 'title':item['title']} for item in records ]
-    )
+    ids = [uuid.uuid4().hex for _ in range(l)]
+    documents = list(map(itemgetter('summary'), records))
+    metadatas = [ {'link':link, 'title':title} for link, title in map(itemgetter('link', 'title'), records) ]
+
+    #store in the chroma DB, in batches so one batch embeds while the previous uploads
+    #(embedding itself is serialized in MyEmbeddingFunction; only uploads run concurrently)
+    def add_batch(i):
+        collection.add(
+            ids = ids[i:i + CHROMA_ADD_BATCH],
+            documents = documents[i:i + CHROMA_ADD_BATCH],
+            metadatas = metadatas[i:i + CHROMA_ADD_BATCH]
+        )
+
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        list(ex.map(add_batch, range(0, l, CHROMA_ADD_BATCH)))
 
     return jsonify(
        message = 'records stored in the DB'
@@ -144,12 +291,27 @@ def extractor():
 def findIdeas():
     try:
         collection = get_chroma_collection()
-        results = collection.get(
-            include=['embeddings', 'metadatas', 'documents']
-        )
-        
-        ids = results['ids']
-        embeddings = np.array(results['embeddings'], dtype=np.float32)
+        # Clear the collection after answering, as before; ?keep=1 keeps the records so
+        # a repeat call on the unchanged collection reuses the cached idea
+        flush = request.args.get('keep') != '1'
+
+        ids = collection.get(include=[])['ids']
+        key = snapshot_key(ids)
+        with _idea_cache_lock:
+            enhanced_idea = _idea_cache.get(key)
+            if enhanced_idea is not None:
+                _idea_cache.move_to_end(key)
+        if enhanced_idea is not None:
+            print(f"Reusing idea for unchanged collection ({len(ids)} ids)")
+            if flush:
+                collection.delete(ids=ids)
+                with _idea_cache_lock:
+                    _idea_cache.pop(key, None)
+            return jsonify(
+                enhanced_idea = enhanced_idea,
+            ), 200
+
+        ids, embeddings, results = load_embeddings(collection)
         documents = results['documents']
         metadatas = results['metadatas']
         
@@ -162,7 +324,8 @@ def findIdeas():
             }), 400
         
         # Fit GMM
-        gmm = GaussianMixture(n_components=3, random_state=42)
+        # Diagonal covariances: O(D) per component instead of 768x768 matrices
+        gmm = GaussianMixture(n_components=3, covariance_type='diag', random_state=42)
         gmm.fit(embeddings)
         
         # Work in log space to avoid overflow
@@ -171,12 +334,12 @@ def findIdeas():
         print(f"Log probabilities: min={log_probs.min():.2f}, "
               f"mean={log_probs.mean():.2f}, max={log_probs.max():.2f}")
         
-        # Find gaps (bottom 10% = low density)
-        threshold_percentile = 10
-        log_threshold = np.percentile(log_probs, threshold_percentile)
-        gap_indices = np.where(log_probs < log_threshold)[0]
+        # Find gaps: the 3 lowest-density documents (quickselect, no full sort)
+        n_gaps = min(3, len(log_probs))
+        gap_indices = np.argpartition(log_probs, n_gaps - 1)[:n_gaps] if n_gaps else np.empty(0, dtype=np.intp)
+        gap_indices = gap_indices[np.argsort(log_probs[gap_indices])]
         
-        print(f"Found {len(gap_indices)} research gaps (bottom {threshold_percentile}%)")
+        print(f"Found {len(gap_indices)} research gaps (lowest density)")
         
         if len(gap_indices) == 0:
             return jsonify({
@@ -185,49 +348,54 @@ def findIdeas():
             }), 200
         
         # Optimization: Find novel low-density point
-        def neg_log_density(x, gmm):
-            return -gmm.score_samples(x.reshape(1, -1))[0]
-        
-        bounds = list(zip(embeddings.min(axis=0), embeddings.max(axis=0)))
-        
-        # Strategy 1: Start from mean + noise
-        initial_v = embeddings.mean(axis=0) + np.random.normal(0, 0.5, embeddings.shape[1])
-        result_1 = minimize(neg_log_density, initial_v, args=(gmm,), bounds=bounds, method='L-BFGS-B')
-        v_1 = result_1.x
-        log_density_1 = gmm.score_samples(v_1.reshape(1, -1))[0]
-        
-        # Strategy 2: Start from midpoint between clusters
+        log_density = gmm_log_density(gmm)
+        lo, hi = embeddings.min(axis=0), embeddings.max(axis=0)
+
+        # Multi-start: the two hand-picked starts (mean + noise, midpoint between
+        # clusters) plus Sobol points covering the data's bounding box
         component_means = gmm.means_
-        midpoint = (component_means[0] + component_means[1]) / 2
-        initial_v_2 = midpoint + np.random.normal(0, 0.2, embeddings.shape[1])
-        result_2 = minimize(neg_log_density, initial_v_2, args=(gmm,), bounds=bounds, method='L-BFGS-B')
-        v_2 = result_2.x
-        log_density_2 = gmm.score_samples(v_2.reshape(1, -1))[0]
-        
-        print(f"Optimized gap 1: log_density={log_density_1:.2f}")
-        print(f"Optimized gap 2: log_density={log_density_2:.2f}")
-        
-        # Choose the lower density one (bigger gap)
-        if log_density_1 < log_density_2:
-            v_optimal = v_1
-            log_density_optimal = log_density_1
-            strategy = "random_perturbation"
-        else:
-            v_optimal = v_2
-            log_density_optimal = log_density_2
-            strategy = "cluster_midpoint"
+        starts = [
+            embeddings.mean(axis=0) + np.random.normal(0, 0.5, embeddings.shape[1]),
+            (component_means[0] + component_means[1]) / 2 + np.random.normal(0, 0.2, embeddings.shape[1]),
+        ]
+        sampler = qmc.Sobol(d=embeddings.shape[1], seed=42)
+        starts.extend(qmc.scale(sampler.random(GAP_SOBOL_STARTS), lo, np.maximum(hi, lo + 1e-6)))
+
+        # All starts descend in one L-BFGS-B run over the stacked (M*D) vector: the
+        # summed objective is separable, so each block still finds its own minimum,
+        # and every iteration is one batched kernel call instead of M Python calls
+        x0 = np.stack(starts)
+        m, d = x0.shape
+
+        def neg_log_density(flat):
+            logp, grad = log_density(flat.reshape(m, d))
+            return -logp.sum(), -grad.ravel()
+
+        result = minimize(neg_log_density, x0.ravel(), jac=True, method='L-BFGS-B',
+                          bounds=Bounds(np.tile(lo, m), np.tile(hi, m)))
+        xs = result.x.reshape(m, d)
+        log_densities, _ = log_density(xs)
+
+        # Keep the lowest density found (biggest gap)
+        best = int(np.argmin(log_densities))
+        v_optimal = xs[best]
+        log_density_optimal = float(log_densities[best])
+
+        print(f"Optimized gap: log_density={log_density_optimal:.2f} "
+              f"(start {best + 1}/{m}, {result.nit} iterations)")
         
         # Prepare for vec2text (768-dim)
         v_optimal_2d = v_optimal.reshape(1, -1).astype(np.float32)
-        v_optimal_tensor = torch.tensor(v_optimal_2d, device='mps')
+        v_optimal_tensor = torch.tensor(v_optimal_2d, device='mps', dtype=torch.bfloat16)  # matches the bf16 corrector
         
         print(f"Inverting embedding shape: {v_optimal_tensor.shape}")
         
         # Invert to text
-        generated_texts = vec2text.invert_embeddings(
-            embeddings=v_optimal_tensor,
-            corrector=corrector
-        )
+        with torch.inference_mode():
+            generated_texts = vec2text.invert_embeddings(
+                embeddings=v_optimal_tensor,
+                corrector=corrector
+            )
         
         generated_text = generated_texts[0] if isinstance(generated_texts, list) else generated_texts
         
@@ -235,9 +403,7 @@ def findIdeas():
         
         # Also analyze existing gaps
         existing_gaps = []
-        sorted_gap_indices = gap_indices[np.argsort(log_probs[gap_indices])][:3]
-        
-        for idx in sorted_gap_indices:
+        for idx in gap_indices:
             existing_gaps.append({
                 'id': ids[idx],
                 'log_density': float(log_probs[idx]),
@@ -273,7 +439,13 @@ def findIdeas():
             except Exception as e:
                 print(f"Error enhancing idea with Claude: {e}")
 
-        collection.delete(ids=ids)
+        if flush:
+            collection.delete(ids=ids)
+        elif enhanced_idea is not None:
+            with _idea_cache_lock:
+                _idea_cache[snapshot_key(ids)] = enhanced_idea
+                while len(_idea_cache) > IDEA_CACHE_SIZE:
+                    _idea_cache.popitem(last=False)
         return jsonify(
             enhanced_idea = enhanced_idea,
         ), 200
@@ -290,18 +462,38 @@ def get3Dpoints():
         include=['embeddings', 'metadatas'],
     )
     
-    emb = results['embeddings']
-    
-    #convert the embedding to 3D 
-    proj_3d = umap_3d.fit_transform(emb)
-    #make clusters
-    clusterer.fit(proj_3d)
+    emb = np.asarray(results['embeddings'], dtype=np.float32)
+
+    # identical collection -> reuse the previous UMAP/HDBSCAN output
+    key = hashlib.blake2b(emb.tobytes(), digest_size=8).hexdigest()
+    with _projection_cache_lock:
+        cached = _projection_cache.get(key)
+    if cached is not None:
+        proj_3d, labels = cached
+    else:
+        if USE_CUML:
+            emb = cupy.asarray(emb)
+
+        # one UMAP fit to 10 dims: cluster there, and project that to 3D for the UI
+        emb_10d = reducer.fit_transform(emb)
+        #make clusters
+        clusterer.fit(emb_10d)
+
+        labels = clusterer.labels_
+        if USE_CUML:
+            emb_10d, labels = cupy.asnumpy(emb_10d), cupy.asnumpy(labels)
+        # orjson only serializes C-contiguous arrays; PCA output isn't always (small inputs)
+        proj_3d = np.ascontiguousarray(PCA(n_components=3).fit_transform(emb_10d))
+
+        with _projection_cache_lock:
+            _projection_cache[key] = (proj_3d, labels)
+            while len(_projection_cache) > PROJECTION_CACHE_SIZE:
+                _projection_cache.popitem(last=False)  # FIFO
 
-    labels = clusterer.labels_
     labels = labels.tolist()
-    embArr = proj_3d.tolist()
+    embArr = proj_3d  # rows go out as-is; the app's orjson provider serializes ndarrays
 
-    links = [ item['link'] for item in results['metadatas']]
+    links = list(map(itemgetter('link'), results['metadatas']))
     titles = results['ids']
 
     return {
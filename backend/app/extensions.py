@@ -1,6 +1,7 @@
 import logging
 import os
 from flask_cors import CORS
+from app.utils.serializers import OrjsonProvider
 
 def init_logging(app):
     level = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -18,4 +19,5 @@ def init_logging(app):
 def init_cors(app):
     CORS(app, resources=app.config.get("CORS_RESOURCES"))
 
-
+def init_json(app):
+    app.json = OrjsonProvider(app)
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from app.utils.utils_fetch_arxiv import fetch_from_arxiv
 from app.utils.utils_fetch_google_patents import fetch_from_google_patents
 
@@ -16,8 +17,12 @@ def fetch_with_fallback(fetch_fn, source_name, keywords, max_results):
 def process_keywords(keywords, max_results):
     """Fetch papers and patents for a single keyword."""
     print(f"\n🔍 Searching for: {keywords}")
-    arxiv_results = fetch_with_fallback(fetch_from_arxiv, "arXiv", keywords, max_results=max_results)
-    patent_results = fetch_with_fallback(fetch_from_google_patents, "Google Patents", keywords, max_results=max_results)
+    # Both sources are network-bound; query them concurrently
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        arxiv_future = ex.submit(fetch_with_fallback, fetch_from_arxiv, "arXiv", keywords, max_results)
+        patent_future = ex.submit(fetch_with_fallback, fetch_from_google_patents, "Google Patents", keywords, max_results)
+        arxiv_results = arxiv_future.result()
+        patent_results = patent_future.result()
 
     # Attach keyword to each result
     return [
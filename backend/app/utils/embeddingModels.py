@@ -1,42 +1,110 @@
+import os
+import sqlite3
+import hashlib
+import threading
 import numpy as np
 import vec2text
 import torch
 from chromadb import Documents, EmbeddingFunction, Embeddings
-from transformers import AutoModel, AutoTokenizer
+from app.utils.models_singleton import ENCODER, TOKENIZER
+
+
+EMBED_BATCH = 16   # documents per encoder forward pass
+MAX_TOKENS = 512
+
+# Persistent embedding cache keyed by SHA-256 of the document text, so abstracts that
+# come back on a later ingest (arxiv/patent runs overlap) skip the encoder entirely.
+# SQLite in WAL mode, so several server workers can share it; each process opens its own
+# connection (never inherited across a fork).
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", ".embed_cache")
+_SQL_VARS = 500  # keys per lookup query, under SQLite's bound-parameter limit
+_cache_lock = threading.Lock()
+# One forward pass at a time: the shared ENCODER (on MPS) isn't safe to drive from
+# several threads, e.g. concurrent collection.add batches
+_encoder_lock = threading.Lock()
+_cache = None
+_cache_pid = None
+
+def _embed_cache():
+    global _cache, _cache_pid
+    if _cache is None or _cache_pid != os.getpid():
+        os.makedirs(EMBED_CACHE_DIR, exist_ok=True)
+        _cache = sqlite3.connect(os.path.join(EMBED_CACHE_DIR, "gtr-t5-base.sqlite3"),
+                                 timeout=30, check_same_thread=False)
+        _cache.execute("PRAGMA journal_mode=WAL")
+        _cache.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+        _cache_pid = os.getpid()
+    return _cache
+
+def _cache_get(cache, keys):
+    found = {}
+    for i in range(0, len(keys), _SQL_VARS):
+        chunk = keys[i:i + _SQL_VARS]
+        rows = cache.execute(
+            f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+        )
+        found.update((k, np.frombuffer(vec, dtype=np.float32)) for k, vec in rows)
+    return [found.get(k) for k in keys]
 
-class Models:
-        encoder = AutoModel.from_pretrained("sentence-transformers/gtr-t5-base").encoder.to("mps")
-        tokenizer = AutoTokenizer.from_pretrained("sentence-transformers/gtr-t5-base")
-        corrector = vec2text.load_pretrained_corrector("gtr-base")
-    
 
 class MyEmbeddingFunction(EmbeddingFunction):
         def __call__(self, input: Documents) -> Embeddings:
-            # Access outer class attributes using DB.attribute_name
-            inputs = Models.tokenizer(
+            keys = [hashlib.sha256(doc.encode("utf-8")).hexdigest() for doc in input]
+            with _cache_lock:
+                out = _cache_get(_embed_cache(), keys)
+
+            # Only documents not seen before go through the encoder
+            misses = [i for i, emb in enumerate(out) if emb is None]
+            if misses:
+                with _encoder_lock:
+                    fresh = self._encode([input[i] for i in misses])
+                for i, emb in zip(misses, fresh):
+                    out[i] = emb
+                with _cache_lock:
+                    with _embed_cache() as cache:  # one transaction
+                        cache.executemany(
+                            "INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)",
+                            [(keys[i], emb.tobytes()) for i, emb in zip(misses, fresh)],
+                        )
+
+            return out
+
+        def _encode(self, input):
+            # Tokenize the whole input once, padded only to its longest document
+            inputs = TOKENIZER(
                 input,
                 return_tensors="pt",
-                max_length=768,
+                max_length=MAX_TOKENS,
                 truncation=True,
-                padding="max_length",
-            ).to('mps')
-            
-            # Get embeddings from the model
-            with torch.no_grad():
-                model_output = Models.encoder(
-                    input_ids=inputs['input_ids'],
-                    attention_mask=inputs['attention_mask']
-                )
-                hidden_state = model_output.last_hidden_state
-            
-            # Pool the embeddings
-            embeddings = vec2text.models.model_utils.mean_pool(
-                hidden_state,
-                inputs['attention_mask']
+                padding=True,
             )
-            
-            # Convert to list format for ChromaDB
-            return embeddings.cpu().detach().numpy().tolist()
+
+            pooled = []
+            with torch.inference_mode():
+                for i in range(0, len(input), EMBED_BATCH):
+                    # Slice the sub-batch and trim padding columns it doesn't need
+                    attention_mask = inputs['attention_mask'][i:i + EMBED_BATCH]
+                    width = int(attention_mask.sum(dim=1).max())
+                    attention_mask = attention_mask[:, :width].to('mps')
+                    input_ids = inputs['input_ids'][i:i + EMBED_BATCH, :width].to('mps')
+
+                    # Get embeddings from the model
+                    model_output = ENCODER(
+                        input_ids=input_ids,
+                        attention_mask=attention_mask
+                    )
+
+                    # Pool the embeddings in fp32 so the bf16 reduction doesn't drift
+                    pooled.append(vec2text.models.model_utils.mean_pool(
+                        model_output.last_hidden_state.float(),
+                        attention_mask
+                    ))
+
+            embeddings = torch.cat(pooled)
+
+            # Chroma accepts ndarray rows: hand it float32 row views of one contiguous
+            # array rather than 768 Python floats per document
+            return list(embeddings.cpu().numpy().astype(np.float32, copy=False))
 
 
     
\ No newline at end of file
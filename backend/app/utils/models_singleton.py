@@ -0,0 +1,21 @@
+"""
+GTR-T5 encoder, tokenizer and vec2text corrector, loaded once per process.
+
+Everything that needs these models imports them from here, so there is a single copy
+of the weights. Loaded at import (i.e. during create_app), which lets a preforking
+server started with --preload share them with its workers copy-on-write.
+"""
+import torch
+import vec2text
+from transformers import AutoModel, AutoTokenizer
+
+# bf16 weights halve memory traffic; activations are upcast before pooling
+ENCODER = AutoModel.from_pretrained(
+    "sentence-transformers/gtr-t5-base", torch_dtype=torch.bfloat16
+).encoder.to("mps")
+TOKENIZER = AutoTokenizer.from_pretrained("sentence-transformers/gtr-t5-base")
+CORRECTOR = vec2text.load_pretrained_corrector("gtr-base")
+
+# Run inversion in bf16 on MPS as well; callers pass bf16 embeddings to match
+CORRECTOR.model = CORRECTOR.model.to("mps", dtype=torch.bfloat16)
+CORRECTOR.inversion_trainer.model = CORRECTOR.inversion_trainer.model.to("mps", dtype=torch.bfloat16)
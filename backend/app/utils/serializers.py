@@ -1,5 +1,7 @@
 import json
 import re
+import orjson
+from flask.json.provider import DefaultJSONProvider
 
 def serialize_claude_text(message):
     """Extract text content from Claude message"""
@@ -14,3 +16,22 @@ def serialize_claude_text(message):
     return None
 
 
+def _to_builtin(obj):
+    # numpy values orjson won't take natively (e.g. non-contiguous arrays)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (falls back to the default for unsupported types).
+    numpy arrays and scalars are serialized natively, so routes can return them without .tolist()"""
+
+    def dumps(self, obj, **kwargs):
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY, default=_to_builtin).decode("utf-8")
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
@@ -1,5 +1,14 @@
 import requests
 import feedparser
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+
+CROSSREF_WORKERS = 16
+
+# Keep-alive connections to CrossRef, shared by the parallel reference lookups
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=CROSSREF_WORKERS))
 
 
 def fetch_from_arxiv(keywords, max_results, enrich_references=True):
@@ -12,8 +21,17 @@ def fetch_from_arxiv(keywords, max_results, enrich_references=True):
     response = requests.get(url)
     feed = feedparser.parse(response.text)
 
+    # Look up CrossRef references for every DOI up front, in parallel
+    crossref_refs = {}
+    if enrich_references:
+        dois = [(i, entry.arxiv_doi) for i, entry in enumerate(feed.entries) if "arxiv_doi" in entry]
+        if dois:
+            with ThreadPoolExecutor(max_workers=min(CROSSREF_WORKERS, len(dois))) as ex:
+                refs = ex.map(fetch_references_from_crossref, [doi for _, doi in dois])
+                crossref_refs = {i: r for (i, _), r in zip(dois, refs)}
+
     papers = []
-    for entry in feed.entries:
+    for i, entry in enumerate(feed.entries):
         ref_links = []
 
         # Add DOI link if available
@@ -23,7 +41,7 @@ def fetch_from_arxiv(keywords, max_results, enrich_references=True):
             ref_links.append(doi_link)
 
             if enrich_references:
-                ref_links.extend(fetch_references_from_crossref(doi))
+                ref_links.extend(crossref_refs.get(i, []))
 
         # Add all related arXiv links (PDF, etc.)
         for link in entry.get("links", []):
@@ -45,7 +63,7 @@ def fetch_references_from_crossref(doi):
     """Fetch referenced DOIs for a paper using CrossRef API."""
     url = f"https://api.crossref.org/works/{doi}"
     try:
-        response = requests.get(url, timeout=5)
+        response = SESSION.get(url, timeout=5)
         if response.status_code != 200:
             return []
         data = response.json().get("message", {})
@@ -1,8 +1,10 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from serpapi import GoogleSearch
 
 
 SERP_API_KEY = os.getenv("SERP_API_KEY")
+DETAILS_WORKERS = 16
 
 
 def fetch_from_google_patents(keywords, max_results):
@@ -18,22 +20,28 @@ def fetch_from_google_patents(keywords, max_results):
     }
     search = GoogleSearch(search_params).get_dict()
 
-    results = []
-    for item in search.get("organic_results", [])[:max_results]:
-        patent_id = item.get("patent_id")
-        link = item.get("patent_link")
-
-        if not patent_id:
-            continue
+    hits = [
+        (item.get("patent_id"), item.get("patent_link"))
+        for item in search.get("organic_results", [])[:max_results]
+        if item.get("patent_id")
+    ]
 
-        # Step 2: fetch full patent details
+    # Step 2: fetch full patent details (one SerpApi call each, issued in parallel)
+    def fetch_details(patent_id):
         details_params = {
             "engine": "google_patents_details",
             "patent_id": patent_id,
             "api_key": SERP_API_KEY,
         }
-        detail = GoogleSearch(details_params).get_dict()
+        return GoogleSearch(details_params).get_dict()
 
+    if not hits:
+        return []
+    with ThreadPoolExecutor(max_workers=min(DETAILS_WORKERS, len(hits))) as ex:
+        details = list(ex.map(fetch_details, [patent_id for patent_id, _ in hits]))
+
+    results = []
+    for (patent_id, link), detail in zip(hits, details):
         title = detail.get("title")
         abstract = detail.get("abstract")
         # references = _extract_reference_links(detail)
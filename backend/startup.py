@@ -2,138 +2,300 @@ import os
 import sys
 import signal
 import atexit
-from pathlib import Path
 from dotenv import load_dotenv
 import subprocess
 import time
+import socket
+import select
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-agent_processes = []
+class _AgentRegistry:
+    """Spawned agents. Updates go through a lock so a shutdown never sees a half-updated
+    list, and take_all() hands the agents to exactly one stopper (main()'s finally or atexit)."""
 
+    def __init__(self):
+        self._lock = threading.Lock()  # the signal handler only raises; it never takes this
+        self._items = []
 
-def _stop_all_agents():
-    """Best-effort termination of all agent subprocesses (and their children)."""
-    global agent_processes
-    if not agent_processes:
-        return
-    
-    print("🛑 Stopping all agent processes...")
-    for agent_info in agent_processes:
-        agent_name = agent_info.get("name", "unknown")
-        process = agent_info.get("process")
-        if not process:
+    def add(self, info):
+        with self._lock:
+            self._items.append(info)
+
+    def items(self):
+        with self._lock:
+            return list(self._items)
+
+    def take_all(self):
+        with self._lock:
+            items, self._items = self._items, []
+        return items
+
+
+agents = _AgentRegistry()
+_child_wakeup_fd = None  # read end of the signal wakeup pipe; readable after SIGCHLD
+
+
+def _agent_ports():
+    """Port each agent serves on once it is up (agents not listed here aren't probed)."""
+    return {
+        "code_agent": int(os.getenv("CODE_AGENT_PORT", "8001")),
+        "feasibility_agent": int(os.getenv("FEASIBILITY_AGENT_PORT", "5010")),
+        "github_agent": 8090,
+        "tavily_reference_agent": int(os.getenv("TAVILY_REFERENCE_AGENT_PORT", "8007")),
+    }
+
+
+def _wait_ready(agent_info, port, abort, timeout=30.0, interval=0.05):
+    """Poll until the agent accepts TCP connections. Gives up at the timeout or as soon as
+    any agent has exited (this one sets `abort` for the others)."""
+    process = agent_info["process"]
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not abort.is_set():
+        if process.poll() is not None:
+            abort.set()
+            return False
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return True
+        except OSError:
+            time.sleep(interval)
+    return False
+
+
+def _send(infos, messages, force=False):
+    """Signal every agent's process group at once (SIGTERM, or SIGKILL when forced).
+    Errors are appended to `messages` rather than printed."""
+    sig = getattr(signal, "SIGKILL", signal.SIGTERM) if force else signal.SIGTERM
+    for agent_info in infos:
+        process = agent_info["process"]
+        if process.poll() is not None:
             continue
-        
         try:
-            # Try graceful SIGTERM to the process group first
-            if hasattr(os, "getpgid"):
-                try:
-                    os.killpg(os.getpgid(process.pid), signal.SIGTERM)
-                except Exception:
-                    process.terminate()
-            else:
-                process.terminate()
-
-            try:
-                process.wait(timeout=5)
-                print(f"  ✅ Stopped {agent_name}")
-            except Exception:
-                # Force kill if it didn't stop
-                if hasattr(os, "getpgid"):
-                    try:
-                        os.killpg(os.getpgid(process.pid), signal.SIGKILL)
-                    except Exception:
-                        pass
+            if agent_info.get("pgid") is not None:
                 try:
-                    process.kill()
-                    print(f"  ⚠️  Force killed {agent_name}")
+                    os.killpg(agent_info["pgid"], sig)
+                    continue
                 except Exception:
                     pass
+            process.kill() if force else process.terminate()
+        except Exception as e:
+            messages.append(f"  ❌ Error stopping {agent_info.get('name', 'unknown')}: {e}\n")
+
+
+def _install_child_wakeup():
+    """Make child exits wake a select() on a pipe (SIGCHLD + set_wakeup_fd), POSIX only."""
+    global _child_wakeup_fd
+    if not hasattr(signal, "SIGCHLD"):
+        return
+    r, w = os.pipe()
+    os.set_blocking(r, False)
+    os.set_blocking(w, False)
+    signal.set_wakeup_fd(w)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    _child_wakeup_fd = r
+
+
+def _reap(infos, deadline):
+    """Wait for agents to exit until the deadline passes; returns survivors.
+    Wakes when a child exits (its pidfd turning readable, else SIGCHLD via the wakeup
+    pipe) instead of polling on a timer."""
+    pending = list(infos)
+    ep = None
+    if hasattr(select, "epoll") and all(info.get("pidfd") is not None for info in pending):
+        ep = select.epoll()
+        for info in pending:
+            ep.register(info["pidfd"], select.EPOLLIN)
+    try:
+        while True:
+            still_running = []
+            for info in pending:
+                if info["process"].poll() is None:
+                    still_running.append(info)
+                elif ep is not None:
+                    ep.unregister(info["pidfd"])  # level-triggered: would wake us forever
+            pending = still_running
+            remaining = deadline - time.monotonic()
+            if not pending or remaining <= 0:
+                break
+            if ep is not None:
+                ep.poll(remaining)
+            elif _child_wakeup_fd is not None:
+                select.select([_child_wakeup_fd], [], [], remaining)
                 try:
-                    process.wait(timeout=2)
-                except Exception:
+                    os.read(_child_wakeup_fd, 512)
+                except BlockingIOError:
                     pass
-        except Exception as e:
-            print(f"  ❌ Error stopping {agent_name}: {e}")
+            else:
+                time.sleep(min(0.1, remaining))
+    finally:
+        if ep is not None:
+            ep.close()
+    return pending
+
+
+def _open_pidfd(pid):
+    """fd that becomes readable when the process exits (Linux 5.3+), else None."""
+    try:
+        return os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        return None
+
+
+def _stop_all_agents():
+    """Best-effort termination of all agent subprocesses (and their children)."""
+    infos = [info for info in agents.take_all() if info.get("process")]
+    if not infos:
+        return
     
-    agent_processes = []
+    print("🛑 Stopping all agent processes...", flush=True)
+    # Per-agent status lines are collected and written once at the end
+    messages = []
+    # Graceful SIGTERM to every process group, then one shared 5s grace period
+    _send(infos, messages)
+    survivors = _reap(infos, time.monotonic() + 5)
+    for agent_info in infos:
+        if agent_info not in survivors:
+            messages.append(f"  ✅ Stopped {agent_info.get('name', 'unknown')}\n")
+
+    # Force kill whatever didn't stop
+    if survivors:
+        _send(survivors, messages, force=True)
+        _reap(survivors, time.monotonic() + 2)
+        for agent_info in survivors:
+            messages.append(f"  ⚠️  Force killed {agent_info.get('name', 'unknown')}\n")
+
+    sys.stdout.write("".join(messages))
+    sys.stdout.flush()
+
+    for agent_info in infos:
+        if agent_info.get("pidfd") is not None:
+            os.close(agent_info["pidfd"])
 
 
 def _handle_signal(signum, frame):
+    # Only unwind here: the server loop exits and main()'s finally stops the agents
+    # in normal control flow. Further signals are ignored so cleanup isn't re-entered.
     print(f"\n🛑 Caught signal {signum}. Stopping services...")
-    _stop_all_agents()
-    # Propagate the signal to allow Flask process to stop if running
-    try:
-        sys.exit(0)
-    except SystemExit:
-        return
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    sys.exit(0)
 
 
 def main():
-    # Load environment variables from .env file
-    # Force override=True to reload changed variables
-    load_dotenv(override=True)
-    print("✅ Environment variables loaded successfully.")
+    # Load environment variables from .env file. Deployments that inject the env
+    # themselves set CURIOSITY_USE_DOTENV=0; already-set variables win unless
+    # CURIOSITY_DOTENV_OVERRIDE=1 (the old override=True behaviour).
+    if os.getenv("CURIOSITY_USE_DOTENV", "1") == "1":
+        load_dotenv(override=os.getenv("CURIOSITY_DOTENV_OVERRIDE", "0") == "1")
+        print("✅ Environment variables loaded successfully.")
 
     # Get the port number from environment variables or default to 9000
     port = os.getenv("FLASK_PORT", "9000")
+    # Agent ports, read once: used by the readiness probes and the banner
+    ports = _agent_ports()
     
-    # Discover and start all agent files in app/agents/
-    agents_dir = Path("app/agents")
-    agent_files = sorted(agents_dir.glob("*_agent.py"))
-    
-    if not agent_files:
-        print("⚠️  No agent files found in app/agents/")
-    else:
-        print(f"🤖 Starting {len(agent_files)} agent(s)...")
-        
-        global agent_processes
-        for agent_file in agent_files:
-            agent_name = agent_file.stem.replace("_", " ").title()
-            
-            # Start agent in its own process group so we can terminate the group
-            kwargs = {}
-            if hasattr(os, "setsid"):
-                kwargs["preexec_fn"] = os.setsid  # macOS/Linux
-            
-            try:
-                process = subprocess.Popen(
-                    ["python3", str(agent_file)],
-                    stdout=None,  # inherit stdout for INFO logs
-                    stderr=subprocess.DEVNULL,  # suppress asyncio errors
-                    env={**os.environ},  # Pass fresh environment
-                    **kwargs,
-                )
-                agent_processes.append({
-                    "name": agent_name,
-                    "file": str(agent_file),
-                    "process": process
-                })
-                print(f"  ✅ Started {agent_name} (PID: {process.pid})")
-            except Exception as e:
-                print(f"  ❌ Failed to start {agent_name}: {e}")
-        
-        time.sleep(2)  # Give agents time to start
-        print(f"✅ All agents started\n")
-    
+    _install_child_wakeup()
 
-    # Start the Flask server (this will block)
-    print(f"🚀 Starting Flask server on port {port}...")
-    print(f"   📍 Main API: http://localhost:{port}")
-    print(f"   📍 Code Agent: http://localhost:{os.getenv('CODE_AGENT_PORT', '8001')}")
-    print(f"   📍 Feasibility: http://localhost:{os.getenv('FEASIBILITY_AGENT_PORT', '5010')}")
-    print(f"   📍 GitHub Agent: http://localhost:8090")
-    print(f"   📍 Tavily Agent: http://localhost:{os.getenv('TAVILY_REFERENCE_AGENT_PORT', '8007')}")
-    print(f"\n   Press CTRL+C to stop all services\n")
-    
-    # Ensure cleanup on process exit and on signals
+    # Ensure cleanup on process exit and on signals. Installed before the first spawn:
+    # agents run in their own sessions, so a Ctrl+C during startup reaches only us.
     atexit.register(_stop_all_agents)
     signal.signal(signal.SIGINT, _handle_signal)
     signal.signal(signal.SIGTERM, _handle_signal)
 
     try:
-        subprocess.run(["python3", "wsgi.py"], stderr=subprocess.DEVNULL)
+        # Discover and start all agent files in app/agents/
+        agents_dir = os.path.join("app", "agents")
+        with os.scandir(agents_dir) as entries:
+            agent_files = sorted(
+                os.path.join(agents_dir, entry.name)
+                for entry in entries
+                if entry.name.endswith("_agent.py") and entry.is_file()
+            )
+
+        if not agent_files:
+            print("⚠️  No agent files found in app/agents/")
+        else:
+            print(f"🤖 Starting {len(agent_files)} agent(s)...")
+        
+            # SUPPRESS_AGENT_STDERR=0 shows agent tracebacks when debugging
+            agent_stderr = subprocess.DEVNULL if os.getenv("SUPPRESS_AGENT_STDERR", "1") == "1" else None
+            for agent_file in agent_files:
+                module = os.path.basename(agent_file)[:-len(".py")]
+                agent_name = module.replace("_", " ").title()
+            
+                try:
+                    # Start agent in its own session/process group so we can terminate the group
+                    # (setsid() runs in C between fork and exec; ignored where unsupported).
+                    # Keep preexec_fn unset: that lets CPython 3.10+ spawn via vfork, so the
+                    # child never copies this process's page tables.
+                    process = subprocess.Popen(
+                        [sys.executable, agent_file],
+                        stdout=None,  # inherit stdout for INFO logs
+                        stderr=agent_stderr,  # suppress asyncio errors unless asked not to
+                        start_new_session=True,
+                        # Only std streams reach the agent; CPython closes the rest with one
+                        # close_range() where the kernel has it. (The app's listen socket
+                        # doesn't exist yet at this point anyway.)
+                        close_fds=True,
+                    )
+                    agents.add({
+                        "name": agent_name,
+                        "file": agent_file,
+                        "module": module,
+                        "process": process,
+                        # start_new_session makes the child a group leader: pgid == pid
+                        "pgid": process.pid if hasattr(os, "killpg") else None,
+                        "pidfd": _open_pidfd(process.pid),
+                    })
+                    print(f"  ✅ Started {agent_name} (PID: {process.pid})")
+                except Exception as e:
+                    print(f"  ❌ Failed to start {agent_name}: {e}")
+        
+            # Wait for agents to accept connections instead of a fixed sleep
+            probes = [
+                (info, ports[info["module"]])
+                for info in agents.items()
+                if info["module"] in ports
+            ]
+            if probes:
+                timeout = float(os.getenv("AGENT_READY_TIMEOUT", "30"))
+                abort = threading.Event()
+                with ThreadPoolExecutor(max_workers=len(probes)) as ex:
+                    try:
+                        ready = list(ex.map(lambda probe: _wait_ready(*probe, abort, timeout), probes))
+                    finally:
+                        abort.set()  # interrupted: don't make the pool's shutdown wait out the probes
+                for (info, agent_port), ok in zip(probes, ready):
+                    if info["process"].poll() is not None:
+                        print(f"  ❌ {info['name']} exited during startup (code {info['process'].returncode})")
+                    elif not ok:
+                        print(f"  ⚠️  {info['name']} not ready on port {agent_port}")
+            print(f"✅ All agents started\n")
+
+        # Start the Flask server (this will block)
+        banner = "\n".join([
+            f"🚀 Starting Flask server on port {port}...",
+            f"   📍 Main API: http://localhost:{port}",
+            f"   📍 Code Agent: http://localhost:{ports['code_agent']}",
+            f"   📍 Feasibility: http://localhost:{ports['feasibility_agent']}",
+            f"   📍 GitHub Agent: http://localhost:{ports['github_agent']}",
+            f"   📍 Tavily Agent: http://localhost:{ports['tavily_reference_agent']}",
+            "",
+            "   Press CTRL+C to stop all services",
+            "",
+        ])
+        sys.stdout.write(banner + "\n")
+        sys.stdout.flush()
+
+        # Serve the app in this process rather than a second interpreter running wsgi.py
+        # (wsgi:app stays the entry point for gunicorn). Imported only now, after the
+        # agents are spawned, so they don't fork with the app and its models loaded.
+        from wsgi import app, serve_app
+
+        serve_app(app, os.getenv("FLASK_HOST", "0.0.0.0"), int(port))
     finally:
-        # Cleanup all agent processes when Flask stops
+        # Cleanup all agent processes when Flask stops (or startup is interrupted)
         _stop_all_agents()
 
 if __name__ == "__main__":
@@ -3,11 +3,21 @@ from app import create_app
 
 app = create_app()
 
+def serve_app(app, host, port):
+    """Serve with waitress' thread pool so slow agent calls don't block other requests;
+    FLASK_DEBUG=1 keeps Flask's dev server (debugger, no reloader)."""
+    if os.getenv("FLASK_DEBUG", "0") == "1":
+        app.run(host=host, port=port, debug=True, use_reloader=False)
+        return
+
+    from waitress import serve
+    serve(app, host=host, port=port, threads=int(os.getenv("FLASK_THREADS", "8")))
+
+
 if __name__ == "__main__":
     # Use FLASK_PORT from environment, defaulting to 9000
     port = int(os.getenv("FLASK_PORT", 9000))
     host = os.getenv("FLASK_HOST", "0.0.0.0")
-    debug = os.getenv("FLASK_DEBUG", "0") == "1"
     
     print(f"🚀 Starting Flask server on {host}:{port}")
-    app.run(host=host, port=port, debug=debug)
+    serve_app(app, host, port)